@@ -1,8 +1,16 @@
 import os
-from shiny import App, ui, render, reactive
+import time
+import asyncio
+import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from shiny import App, ui, render, reactive, req
 from shinywidgets import output_widget, render_widget  # Add shinywidgets import
 import ibis
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 import plotly.express as px
 from dotenv import load_dotenv
 from databricks.sdk.core import Config
@@ -58,114 +66,581 @@ app_ui = ui.page_fillable(
                 ui.nav_panel("Regional Summary", ui.output_data_frame("regional_table")),
                 ui.nav_panel("Product Summary", ui.output_data_frame("product_table"))
             )
+        ),
+        id="analysis_tabs"
+    )
+)
+
+def connect_to_databricks():
+    """Open a new Ibis connection to the Databricks SQL warehouse"""
+    # Get warehouse ID from environment variable  
+    warehouse_id = os.getenv("WAREHOUSE_ID")
+    if not warehouse_id:
+        raise ValueError("WAREHOUSE_ID environment variable not set")
+    
+    # Initialize Databricks config
+    cfg = Config()
+    
+    # Connect using the same pattern as the EDA notebook
+    return ibis.databricks.connect(
+        http_path=f"/sql/1.0/warehouses/{warehouse_id}",
+        server_hostname=cfg.host,
+        credentials_provider=lambda: cfg.authenticate,
+        catalog=os.getenv("DATABRICKS_CATALOG", "jb-demos"),
+        schema=os.getenv("DATABRICKS_SCHEMA", "sales_example"),
+        memtable_volume=os.getenv("DATABRICKS_MEMTABLE_VOLUME", "ibis_memtable")
+    )
+
+# Connection shared by every session, so each new session doesn't pay for
+# its own TLS handshake and OAuth token fetch. Re-verified once per check
+# interval (seconds), whether or not it has been used since, and re-probed
+# when a query on it fails. Only a failed probe replaces it, so a bad query
+# doesn't force every session to reconnect
+CONNECTION_CHECK_INTERVAL = 300
+connection_lock = threading.Lock()
+connection_state = {"con": None, "checked": 0.0}
+
+def get_connection():
+    """Get the shared Databricks connection, reconnecting if it has dropped"""
+    with connection_lock:
+        con = connection_state["con"]
+        now = time.monotonic()
+        
+        if con is not None and now - connection_state["checked"] > CONNECTION_CHECK_INTERVAL:
+            try:
+                con.list_tables()
+                connection_state["checked"] = now
+            except Exception as e:
+                print(f"Databricks connection lost, reconnecting: {str(e)}")
+                close_connection(con)
+                con = None
+        
+        if con is None:
+            try:
+                con = connect_to_databricks()
+            except Exception as e:
+                print(f"Failed to connect to Databricks: {str(e)}")
+                return None
+            
+            # Results cached against a previous connection are stale
+            clear_query_caches()
+            connection_state["con"] = con
+            connection_state["checked"] = now
+        
+        return con
+
+def recheck_connection():
+    """Re-probe the shared connection after a failed query, dropping it if it has gone"""
+    with connection_lock:
+        con = connection_state["con"]
+        if con is None:
+            return
+        
+        try:
+            con.list_tables()
+            connection_state["checked"] = time.monotonic()
+        except Exception as e:
+            print(f"Databricks connection lost, reconnecting: {str(e)}")
+            close_connection(con)
+            connection_state["con"] = None
+
+def close_connection(con):
+    """Close a connection that is being replaced"""
+    try:
+        con.disconnect()
+    except Exception as e:
+        print(f"Error closing Databricks connection: {str(e)}")
+
+def filter_sales(sales, start_date, end_date, regions, products):
+    """Apply the dashboard filters to a sales table expression"""
+    filtered_sales = sales
+    
+    # Date filter
+    if start_date is not None and end_date is not None:
+        filtered_sales = filtered_sales.filter(
+            (filtered_sales.date >= start_date) &
+            (filtered_sales.date <= end_date)
+        )
+    
+    # Region filter
+    if regions:
+        filtered_sales = filtered_sales.filter(
+            filtered_sales.region.isin(regions)
+        )
+    
+    # Product filter
+    if products:
+        filtered_sales = filtered_sales.filter(
+            filtered_sales.product.isin(products)
+        )
+    
+    return filtered_sales
+
+# Columns the row-level plots read; the ID, name and email strings that
+# make up most of a sales row are never fetched
+SALES_ROW_COLUMNS = ("date", "region", "customer_id", "quantity", "total_amount")
+
+# Numeric dtypes the sales rows are materialized with
+SALES_NUMERIC_TYPES = {
+    "quantity": pa.int32(),
+    "total_amount": pa.float64()
+}
+
+@functools.lru_cache(maxsize=32)
+def fetch_sales_table(start_date, end_date, regions, products):
+    """Query Databricks for one combination of filter values as an Arrow table"""
+    sales = get_connection().table("sales")
+    table = (
+        filter_sales(sales, start_date, end_date, regions, products)
+        .select(*SALES_ROW_COLUMNS)
+        .to_pyarrow()
+    )
+    
+    # Pin numeric columns to fixed types; a DECIMAL column would otherwise
+    # run every sum/mean through decimal arithmetic
+    for column, arrow_type in SALES_NUMERIC_TYPES.items():
+        index = table.schema.get_field_index(column)
+        table = table.set_column(index, column, table[column].cast(arrow_type))
+    
+    # Left as Arrow: the plots aggregate it with Arrow compute kernels and
+    # only convert their small grouped results to pandas
+    return table
+
+def query_sales(start_date, end_date, regions, products):
+    """Filtered sales table expression on the shared connection"""
+    return filter_sales(get_connection().table("sales"), start_date, end_date, regions, products)
+
+# Aggregate queries, cached per combination of filter values like the rows
+# above. The results are shared between sessions, so callers must not
+# modify them in place
+@functools.lru_cache(maxsize=32)
+def fetch_summary_metrics(*filters):
+    """Summary card values in a single query"""
+    sales = query_sales(*filters)
+    return sales.aggregate(
+        total=sales.total_amount.sum(),
+        n=sales.count(),
+        avg=sales.total_amount.mean(),
+        uniq=sales.customer_id.nunique()
+    ).execute().to_dict("records")[0]
+
+@functools.lru_cache(maxsize=32)
+def fetch_regional_sales(*filters):
+    """Total sales per region"""
+    sales = query_sales(*filters)
+    return (
+        sales.group_by("region")
+        .aggregate(total_amount=sales.total_amount.sum())
+        .order_by("total_amount")
+        .execute()
+    )
+
+@functools.lru_cache(maxsize=32)
+def fetch_top_products(*filters):
+    """Top 10 products by revenue"""
+    sales = query_sales(*filters)
+    return (
+        sales.group_by("product")
+        .aggregate(total_amount=sales.total_amount.sum())
+        .order_by(ibis.desc("total_amount"))
+        .limit(10)
+        .execute()
+    )
+
+@functools.lru_cache(maxsize=32)
+def fetch_product_profitability(*filters):
+    """Top 15 products by revenue per unit"""
+    sales = query_sales(*filters)
+    product_metrics = (
+        sales.group_by("product")
+        .aggregate(
+            total_amount=sales.total_amount.sum(),
+            quantity=sales.quantity.sum(),
+            unit_price=sales.unit_price.mean(),
+            discount_percent=sales.discount_percent.mean()
+        )
+    )
+    return (
+        product_metrics
+        .mutate(revenue_per_unit=product_metrics.total_amount / product_metrics.quantity)
+        .order_by(ibis.desc("revenue_per_unit"))
+        .limit(15)
+        .execute()
+    )
+
+@functools.lru_cache(maxsize=32)
+def fetch_product_region(*filters):
+    """Total sales per product and region"""
+    # Aggregate every product by region in a single scan; the top 15
+    # products are picked from this small result locally
+    sales = query_sales(*filters)
+    return (
+        sales.group_by(["product", "region"])
+        .aggregate(total_amount=sales.total_amount.sum())
+        .execute()
+    )
+
+@functools.lru_cache(maxsize=32)
+def fetch_regional_summary(*filters):
+    """Regional summary table"""
+    sales = query_sales(*filters)
+    return (
+        sales.group_by("region")
+        .aggregate(
+            total_sales=sales.total_amount.sum(),
+            avg_transaction=sales.total_amount.mean(),
+            total_quantity=sales.quantity.sum(),
+            total_transactions=sales.customer_id.count(),
+            unique_customers=sales.customer_id.nunique(),
+            avg_discount=sales.discount_percent.mean()
         )
+        .order_by("region")
+        .execute()
     )
+
+@functools.lru_cache(maxsize=32)
+def fetch_product_summary(*filters):
+    """Top 20 products summary table"""
+    sales = query_sales(*filters)
+    return (
+        sales.group_by("product")
+        .aggregate(
+            total_sales=sales.total_amount.sum(),
+            total_quantity=sales.quantity.sum(),
+            avg_unit_price=sales.unit_price.mean(),
+            avg_discount=sales.discount_percent.mean(),
+            total_transactions=sales.customer_id.count()
+        )
+        .order_by(ibis.desc("total_sales"))
+        .limit(20)
+        .execute()
+    )
+
+# Every per-filter cache, cleared together on reconnect and once the TTL
+# (seconds) lapses, so new warehouse data shows up on the same schedule as
+# new filter choices
+QUERY_CACHE_TTL = 300
+query_caches = (
+    fetch_sales_table,
+    fetch_summary_metrics,
+    fetch_regional_sales,
+    fetch_top_products,
+    fetch_product_profitability,
+    fetch_product_region,
+    fetch_regional_summary,
+    fetch_product_summary
 )
+query_cache_state = {"expires": 0.0}
+
+def clear_query_caches():
+    """Clear every per-filter cache and restart the TTL"""
+    for fetch in query_caches:
+        fetch.cache_clear()
+    query_cache_state["expires"] = time.monotonic() + QUERY_CACHE_TTL
+
+def expire_query_caches():
+    """Clear the per-filter caches if the TTL has lapsed"""
+    if time.monotonic() >= query_cache_state["expires"]:
+        clear_query_caches()
+
+# Plot builders - pure functions from query results to Plotly figures. The
+# two row-level plots run on the worker pool; the rest are built inline
+# right after their aggregate query
+plot_executor = ThreadPoolExecutor(max_workers=4)
+
+def build_regional_sales_plot(regional_summary):
+    """Horizontal bar chart of total sales per region"""
+    fig = px.bar(
+        regional_summary,
+        x="total_amount",
+        y="region",
+        orientation="h",
+        title="Total Sales by Region",
+        labels={"total_amount": "Total Sales ($)", "region": "Region"}
+    )
+    
+    fig.update_layout(height=400)
+    return fig
+
+def build_regional_metrics_plot(table):
+    """Scatter of sales per customer against customer count by region"""
+    # Group the Arrow rows directly; only the one-row-per-region result is
+    # converted to pandas
+    regional_metrics = (
+        table.group_by("region")
+        .aggregate([
+            ("total_amount", "sum"),
+            ("total_amount", "mean"),
+            ("customer_id", "count_distinct"),
+            ("quantity", "sum")
+        ])
+        .sort_by("region")
+        .to_pandas()
+        .rename(columns={
+            "total_amount_sum": "total_sales",
+            "total_amount_mean": "avg_transaction",
+            "customer_id_count_distinct": "unique_customers",
+            "quantity_sum": "total_quantity"
+        })
+    )
+    
+    regional_metrics["sales_per_customer"] = regional_metrics["total_sales"] / regional_metrics["unique_customers"]
+    
+    fig = px.scatter(
+        regional_metrics,
+        x="unique_customers",
+        y="sales_per_customer",
+        size="total_sales",
+        color="region",
+        title="Sales per Customer vs Customer Count by Region",
+        labels={
+            "unique_customers": "Number of Customers",
+            "sales_per_customer": "Sales per Customer ($)"
+        }
+    )
+    
+    fig.update_layout(height=400)
+    return fig
+
+def build_sales_timeline_plot(table):
+    """Monthly sales line per region"""
+    # Floor each date to the first of its month with an Arrow kernel
+    months = pc.floor_temporal(table["date"], unit="month")
+    
+    # Group by month and region; sort so the lines draw in date order
+    monthly_data = (
+        table.select(["region", "total_amount"])
+        .append_column("date", months)
+        .group_by(["date", "region"])
+        .aggregate([("total_amount", "sum")])
+        .sort_by([("date", "ascending"), ("region", "ascending")])
+        .to_pandas(date_as_object=False)
+        .rename(columns={"total_amount_sum": "total_amount"})
+    )
+    
+    fig = px.line(
+        monthly_data,
+        x="date",
+        y="total_amount",
+        color="region",
+        title="Sales Trend Over Time by Region",
+        labels={"total_amount": "Total Sales ($)", "date": "Date"}
+    )
+    
+    fig.update_layout(height=400)
+    return fig
+
+def build_top_products_plot(top_products):
+    """Bar chart of the top products by revenue"""
+    fig = px.bar(
+        top_products,
+        x="product",
+        y="total_amount",
+        title="Top 10 Products by Revenue",
+        labels={"total_amount": "Total Sales ($)", "product": "Product"}
+    )
+    
+    fig.update_xaxes(tickangle=45)
+    fig.update_layout(height=400)
+    return fig
+
+def build_product_profitability_plot(top_profitable):
+    """Scatter of revenue per unit against quantity for the top products"""
+    fig = px.scatter(
+        top_profitable,
+        x="quantity",
+        y="revenue_per_unit",
+        size="total_amount",
+        color="discount_percent",
+        hover_name="product",
+        title="Product Profitability: Revenue per Unit vs Quantity",
+        labels={
+            "quantity": "Total Quantity Sold",
+            "revenue_per_unit": "Revenue per Unit ($)",
+            "discount_percent": "Avg Discount %"
+        }
+    )
+    
+    fig.update_layout(height=400)
+    return fig
+
+def build_product_region_heatmap(product_region):
+    """Heatmap of sales per product and region for the top 15 products"""
+    product_codes, products = pd.factorize(product_region["product"], sort=True)
+    totals = product_region["total_amount"].to_numpy()
+    
+    # Get top 15 products from per-product totals; argpartition selects them
+    # without sorting every product
+    top_codes = np.arange(len(products))
+    if len(products) > 15:
+        product_totals = np.bincount(product_codes, weights=totals, minlength=len(products))
+        top_codes = np.sort(np.argpartition(-product_totals, 14)[:15])
+    
+    # Map each kept product code to its heatmap row, -1 for the rest
+    rows = np.full(len(products), -1)
+    rows[top_codes] = np.arange(len(top_codes))
+    keep = rows[product_codes] >= 0
+    
+    # Accumulate straight into a dense product x region matrix rather than
+    # pivoting through intermediate frames; missing cells stay at zero
+    region_codes, regions = pd.factorize(product_region["region"][keep], sort=True)
+    heatmap_values = np.zeros((len(top_codes), len(regions)))
+    np.add.at(heatmap_values, (rows[product_codes[keep]], region_codes), totals[keep])
+    heatmap_data = pd.DataFrame(heatmap_values, index=products[top_codes], columns=regions)
+    
+    # px.imshow reads the axes from the frame's index and columns
+    fig = px.imshow(
+        heatmap_data,
+        color_continuous_scale="Blues",
+        title="Product Sales by Region (Top 15 Products)",
+        labels={"color": "Sales ($)"}
+    )
+    
+    fig.update_layout(height=500)
+    return fig
+
+# Filter choices shared by every session, refreshed after the TTL (seconds)
+FILTER_CHOICES_TTL = QUERY_CACHE_TTL
+filter_choices_cache = {"choices": None, "expires": 0.0}
+
+# Filter inputs must stay unchanged this long (seconds) before re-querying
+FILTER_DEBOUNCE = 0.3
 
 def server(input, output, session):
     
+    # Debounced filters: every input change restarts the timer, and only the
+    # settled values reach the queries, so picking several regions in a row
+    # issues one query instead of one per click
+    pending_filters = reactive.value(None)
+    settled_filters = reactive.value(None)
+    filter_deadline = {"at": 0.0}
+    
+    @reactive.effect
+    def queue_filters():
+        pending_filters.set((input.date_filter(), input.region_filter(), input.product_filter()))
+        filter_deadline["at"] = time.monotonic() + FILTER_DEBOUNCE
+    
+    @reactive.effect
+    def settle_filters():
+        filters = pending_filters()
+        remaining = filter_deadline["at"] - time.monotonic()
+        if remaining > 0:
+            reactive.invalidate_later(remaining)
+            return
+        settled_filters.set(filters)
+    
     @reactive.calc
-    def get_connection():
-        """Initialize Databricks connection"""
-        try:
-            # Get warehouse ID from environment variable  
-            warehouse_id = os.getenv("WAREHOUSE_ID")
-            if not warehouse_id:
-                raise ValueError("WAREHOUSE_ID environment variable not set")
-            
-            # Initialize Databricks config
-            cfg = Config()
-            
-            # Connect using the same pattern as the EDA notebook
-            con = ibis.databricks.connect(
-                http_path=f"/sql/1.0/warehouses/{warehouse_id}",
-                server_hostname=cfg.host,
-                credentials_provider=lambda: cfg.authenticate,
-                catalog=os.getenv("DATABRICKS_CATALOG", "jb-demos"),
-                schema=os.getenv("DATABRICKS_SCHEMA", "sales_example"),
-                memtable_volume=os.getenv("DATABRICKS_MEMTABLE_VOLUME", "ibis_memtable")
-            )
-            
-            return con
-        except Exception as e:
-            print(f"Failed to connect to Databricks: {str(e)}")
+    def get_filter_values():
+        """Current filter inputs as hashable values"""
+        filters = settled_filters()
+        req(filters is not None)
+        
+        date_filter, region_filter, product_filter = filters
+        start_date, end_date = date_filter or (None, None)
+        regions = tuple(sorted(region_filter or ()))
+        products = tuple(sorted(product_filter or ()))
+        
+        # Selecting every value filters nothing, so drop the selection and
+        # the query skips its IN predicate (the default state after load)
+        choices = get_filter_choices()
+        if set(regions) == set(choices["regions"]):
+            regions = ()
+        if set(products) == set(choices["all_products"]):
+            products = ()
+        
+        return start_date, end_date, regions, products
+    
+    @reactive.calc
+    def get_query_filters():
+        """Filter values for the aggregate queries, or None if not connected"""
+        con = get_connection()
+        if con is None:
             return None
+        
+        # Every aggregate fetcher is keyed on these values
+        filters = get_filter_values()
+        expire_query_caches()
+        return filters
     
     @reactive.calc
-    def get_sales_data():
-        """Get sales data from Databricks"""
+    def get_sales_table():
+        """Materialize the filtered sales rows as Arrow, for plots that need them"""
         con = get_connection()
         if con is None:
-            return pd.DataFrame()
+            return pa.table({})
+        
+        # Filter values are hashable, so revisiting a previous combination
+        # is served from the cache instead of the warehouse
+        filters = get_filter_values()
+        expire_query_caches()
         
         try:
-            sales = con.table("sales")
-            
-            # Apply filters
-            filtered_sales = sales
-            
-            # Date filter
-            if input.date_filter():
-                start_date, end_date = input.date_filter()
-                filtered_sales = filtered_sales.filter(
-                    (filtered_sales.date >= start_date) & 
-                    (filtered_sales.date <= end_date)
-                )
-            
-            # Region filter
-            if input.region_filter():
-                filtered_sales = filtered_sales.filter(
-                    filtered_sales.region.isin(input.region_filter())
-                )
-            
-            # Product filter
-            if input.product_filter():
-                filtered_sales = filtered_sales.filter(
-                    filtered_sales.product.isin(input.product_filter())
-                )
-            
-            return filtered_sales.execute()
+            return fetch_sales_table(*filters)
         except Exception as e:
             print(f"Error fetching sales data: {str(e)}")
-            return pd.DataFrame()
+            recheck_connection()
+            return pa.table({})
     
     @reactive.calc
     def get_filter_choices():
         """Get unique values for filters"""
+        # Choices don't depend on any input, so all sessions share one result
+        if time.monotonic() < filter_choices_cache["expires"]:
+            return filter_choices_cache["choices"]
+        
         con = get_connection()
         if con is None:
-            return {"regions": [], "products": [], "date_range": None}
+            return {"regions": [], "products": [], "all_products": [], "date_range": None}
         
         try:
             sales = con.table("sales")
             
+            # One scan of the table: per region/product totals and date bounds.
+            # The result has at most regions x products rows, and the three
+            # choices are all derived from it locally
+            region_products = (
+                sales
+                .group_by(["region", "product"])
+                .aggregate(
+                    total_sales=sales.total_amount.sum(),
+                    min_date=sales.date.min(),
+                    max_date=sales.date.max()
+                )
+                .to_pyarrow()
+            )
+            
             # Get unique regions
-            regions = sales.select("region").distinct().execute()["region"].tolist()
+            regions = pc.unique(region_products["region"]).to_pylist()
             
             # Get top 20 products by sales
-            top_products = (
-                sales
+            product_sales = (
+                region_products
                 .group_by("product")
-                .aggregate(total_sales=sales.total_amount.sum())
-                .order_by(ibis.desc("total_sales"))
-                .limit(20)
-                .execute()
-            )["product"].tolist()
+                .aggregate([("total_sales", "sum")])
+                .sort_by([("total_sales_sum", "descending")])
+            )
+            top_products = product_sales.slice(0, 20)["product"].to_pylist()
+            all_products = product_sales["product"].to_pylist()
             
             # Get date range
-            date_stats = sales.select(
-                min_date=sales.date.min(),
-                max_date=sales.date.max()
-            ).execute()
+            date_range = (
+                pc.min(region_products["min_date"]).as_py(),
+                pc.max(region_products["max_date"]).as_py()
+            )
             
-            return {
+            choices = {
                 "regions": regions,
                 "products": top_products,
-                "date_range": (date_stats["min_date"].iloc[0], date_stats["max_date"].iloc[0])
+                "all_products": all_products,
+                "date_range": date_range
             }
+            filter_choices_cache["choices"] = choices
+            filter_choices_cache["expires"] = time.monotonic() + FILTER_CHOICES_TTL
+            return choices
         except Exception as e:
             print(f"Error getting filter choices: {str(e)}")
-            return {"regions": [], "products": [], "date_range": None}
+            recheck_connection()
+            return {"regions": [], "products": [], "all_products": [], "date_range": None}
     
     # Update filter choices when app loads
     @reactive.effect
@@ -181,279 +656,206 @@ def server(input, output, session):
                                 end=choices["date_range"][1])
     
     # Summary metrics
+    @reactive.calc
+    def summary_metrics():
+        """Compute all summary card values in a single query"""
+        filters = get_query_filters()
+        if filters is None:
+            return None
+        
+        try:
+            metrics = fetch_summary_metrics(*filters)
+        except Exception as e:
+            print(f"Error fetching summary metrics: {str(e)}")
+            recheck_connection()
+            return None
+        
+        if metrics["n"] == 0:
+            return None
+        return metrics
+    
     @render.text
     def total_sales():
-        data = get_sales_data()
-        if data.empty:
+        metrics = summary_metrics()
+        if metrics is None:
             return "$0"
-        return f"${data['total_amount'].sum():,.0f}"
+        return f"${metrics['total']:,.0f}"
     
     @render.text
     def total_transactions():
-        data = get_sales_data()
-        if data.empty:
+        metrics = summary_metrics()
+        if metrics is None:
             return "0"
-        return f"{len(data):,}"
+        return f"{metrics['n']:,}"
     
     @render.text
     def avg_transaction():
-        data = get_sales_data()
-        if data.empty:
+        metrics = summary_metrics()
+        if metrics is None:
             return "$0"
-        return f"${data['total_amount'].mean():.2f}"
+        return f"${metrics['avg']:.2f}"
     
     @render.text
     def unique_customers():
-        data = get_sales_data()
-        if data.empty:
+        metrics = summary_metrics()
+        if metrics is None:
             return "0"
-        return f"{data['customer_id'].nunique():,}"
+        return f"{metrics['uniq']:,}"
+    
+    # Row-level plots are the slowest to build, so they run as extended
+    # tasks on the worker pool. The session keeps serving the cheap outputs
+    # meanwhile, and each of these shows as recalculating until it lands
+    @reactive.extended_task
+    async def regional_metrics_task(table):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(plot_executor, build_regional_metrics_plot, table)
+    
+    @reactive.extended_task
+    async def sales_timeline_task(table):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(plot_executor, build_sales_timeline_plot, table)
+    
+    # Table the row-level plots were last started for
+    sales_plots_table = {"table": None}
+    
+    @reactive.effect
+    def start_sales_plots():
+        """Start every row-level plot build for the current filters at once"""
+        # Effects are never suspended, so wait until the plots are shown
+        # before fetching rows for them, as their hidden outputs would
+        if input.analysis_tabs() != "Regional Analysis":
+            return
+        
+        table = get_sales_table()
+        if table is sales_plots_table["table"]:
+            return
+        sales_plots_table["table"] = table
+        
+        # Only the newest result matters, so drop any stale build instead of
+        # letting invoke() queue the new one behind it
+        regional_metrics_task.cancel()
+        sales_timeline_task.cancel()
+        if table.num_rows == 0:
+            return
+        
+        regional_metrics_task.invoke(table)
+        sales_timeline_task.invoke(table)
+    
     # Regional Analysis Plots - Updated to use @render_widget
     @render_widget
     def regional_sales_plot():
-        data = get_sales_data()
-        if data.empty:
+        filters = get_query_filters()
+        if filters is None:
             return None
         
-        regional_summary = (
-            data.groupby("region")
-            .agg({
-                "total_amount": "sum",
-                "customer_id": "count"
-            })
-            .reset_index()
-            .sort_values("total_amount", ascending=True)
-        )
+        try:
+            regional_summary = fetch_regional_sales(*filters)
+        except Exception as e:
+            print(f"Error fetching regional sales: {str(e)}")
+            recheck_connection()
+            return None
         
-        fig = px.bar(
-            regional_summary,
-            x="total_amount",
-            y="region",
-            orientation="h",
-            title="Total Sales by Region",
-            labels={"total_amount": "Total Sales ($)", "region": "Region"}
-        )
+        if regional_summary.empty:
+            return None
         
-        fig.update_layout(height=400)
-        return fig
+        return build_regional_sales_plot(regional_summary)
     
     @render_widget
     def regional_metrics_plot():
-        data = get_sales_data()
-        if data.empty:
+        if get_sales_table().num_rows == 0:
             return None
-        
-        regional_metrics = (
-            data.groupby("region")
-            .agg({
-                "total_amount": ["sum", "mean"],
-                "customer_id": "nunique",
-                "quantity": "sum"
-            })
-            .reset_index()
-        )
-        
-        # Flatten column names
-        regional_metrics.columns = ["region", "total_sales", "avg_transaction", "unique_customers", "total_quantity"]
-        regional_metrics["sales_per_customer"] = regional_metrics["total_sales"] / regional_metrics["unique_customers"]
-        
-        fig = px.scatter(
-            regional_metrics,
-            x="unique_customers",
-            y="sales_per_customer",
-            size="total_sales",
-            color="region",
-            title="Sales per Customer vs Customer Count by Region",
-            labels={
-                "unique_customers": "Number of Customers",
-                "sales_per_customer": "Sales per Customer ($)"
-            }
-        )
-        
-        fig.update_layout(height=400)
-        return fig
+        return regional_metrics_task.result()
     
     @render_widget
     def sales_timeline_plot():
-        data = get_sales_data()
-        if data.empty:
+        if get_sales_table().num_rows == 0:
             return None
-        
-        # Convert date column to datetime
-        data["date"] = pd.to_datetime(data["date"])
-        
-        # Group by month and region
-        monthly_data = (
-            data.groupby([data["date"].dt.to_period("M"), "region"])
-            .agg({"total_amount": "sum"})
-            .reset_index()
-        )
-        monthly_data["date"] = monthly_data["date"].dt.to_timestamp()
-        
-        fig = px.line(
-            monthly_data,
-            x="date",
-            y="total_amount",
-            color="region",
-            title="Sales Trend Over Time by Region",
-            labels={"total_amount": "Total Sales ($)", "date": "Date"}
-        )
-        
-        fig.update_layout(height=400)
-        return fig
+        return sales_timeline_task.result()
     
     # Product Analysis Plots - Updated to use @render_widget
     @render_widget
     def top_products_plot():
-        data = get_sales_data()
-        if data.empty:
+        filters = get_query_filters()
+        if filters is None:
             return None
         
-        top_products = (
-            data.groupby("product")
-            .agg({"total_amount": "sum"})
-            .reset_index()
-            .sort_values("total_amount", ascending=False)
-            .head(10)
-        )
+        try:
+            top_products = fetch_top_products(*filters)
+        except Exception as e:
+            print(f"Error fetching top products: {str(e)}")
+            recheck_connection()
+            return None
         
-        fig = px.bar(
-            top_products,
-            x="product",
-            y="total_amount",
-            title="Top 10 Products by Revenue",
-            labels={"total_amount": "Total Sales ($)", "product": "Product"}
-        )
+        if top_products.empty:
+            return None
         
-        fig.update_xaxes(tickangle=45)
-        fig.update_layout(height=400)
-        return fig
+        return build_top_products_plot(top_products)
     
     @render_widget
     def product_profitability_plot():
-        data = get_sales_data()
-        if data.empty:
+        filters = get_query_filters()
+        if filters is None:
             return None
         
-        product_metrics = (
-            data.groupby("product")
-            .agg({
-                "total_amount": "sum",
-                "quantity": "sum",
-                "unit_price": "mean",
-                "discount_percent": "mean"
-            })
-            .reset_index()
-        )
+        try:
+            top_profitable = fetch_product_profitability(*filters)
+        except Exception as e:
+            print(f"Error fetching product profitability: {str(e)}")
+            recheck_connection()
+            return None
         
-        product_metrics["revenue_per_unit"] = product_metrics["total_amount"] / product_metrics["quantity"]
-        top_profitable = product_metrics.nlargest(15, "revenue_per_unit")
-        
-        fig = px.scatter(
-            top_profitable,
-            x="quantity",
-            y="revenue_per_unit",
-            size="total_amount",
-            color="discount_percent",
-            hover_name="product",
-            title="Product Profitability: Revenue per Unit vs Quantity",
-            labels={
-                "quantity": "Total Quantity Sold",
-                "revenue_per_unit": "Revenue per Unit ($)",
-                "discount_percent": "Avg Discount %"
-            }
-        )
+        if top_profitable.empty:
+            return None
         
-        fig.update_layout(height=400)
-        return fig
+        return build_product_profitability_plot(top_profitable)
     
     @render_widget
     def product_region_heatmap():
-        data = get_sales_data()
-        if data.empty:
+        filters = get_query_filters()
+        if filters is None:
             return None
         
-        # Get top 15 products
-        top_products = (
-            data.groupby("product")["total_amount"]
-            .sum()
-            .nlargest(15)
-            .index.tolist()
-        )
-        
-        # Filter data and create pivot
-        filtered_data = data[data["product"].isin(top_products)]
-        heatmap_data = (
-            filtered_data.groupby(["product", "region"])["total_amount"]
-            .sum()
-            .reset_index()
-            .pivot(index="product", columns="region", values="total_amount")
-            .fillna(0)
-        )
+        try:
+            product_region = fetch_product_region(*filters)
+        except Exception as e:
+            print(f"Error fetching product/region sales: {str(e)}")
+            recheck_connection()
+            return None
         
-        fig = px.imshow(
-            heatmap_data.values,
-            x=heatmap_data.columns,
-            y=heatmap_data.index,
-            color_continuous_scale="Blues",
-            title="Product Sales by Region (Top 15 Products)",
-            labels={"color": "Sales ($)"}
-        )
+        if product_region.empty:
+            return None
         
-        fig.update_layout(height=500)
-        return fig
+        return build_product_region_heatmap(product_region)
     
     # Data Tables
     @render.data_frame
     def regional_table():
-        data = get_sales_data()
-        if data.empty:
+        filters = get_query_filters()
+        if filters is None:
             return pd.DataFrame()
         
-        regional_summary = (
-            data.groupby("region")
-            .agg({
-                "total_amount": ["sum", "mean"],
-                "quantity": "sum",
-                "customer_id": ["count", "nunique"],
-                "discount_percent": "mean"
-            })
-            .round(2)
-        )
-        
-        # Flatten column names
-        regional_summary.columns = [
-            "total_sales", "avg_transaction", "total_quantity", 
-            "total_transactions", "unique_customers", "avg_discount"
-        ]
+        try:
+            regional_summary = fetch_regional_summary(*filters)
+        except Exception as e:
+            print(f"Error fetching regional summary: {str(e)}")
+            recheck_connection()
+            return pd.DataFrame()
         
-        return regional_summary.reset_index()
+        return regional_summary.round(2)
     
     @render.data_frame  
     def product_table():
-        data = get_sales_data()
-        if data.empty:
+        filters = get_query_filters()
+        if filters is None:
             return pd.DataFrame()
         
-        product_summary = (
-            data.groupby("product")
-            .agg({
-                "total_amount": "sum",
-                "quantity": "sum", 
-                "unit_price": "mean",
-                "discount_percent": "mean",
-                "customer_id": "count"
-            })
-            .round(2)
-            .sort_values("total_amount", ascending=False)
-            .head(20)
-        )
-        
-        product_summary.columns = [
-            "total_sales", "total_quantity", "avg_unit_price", 
-            "avg_discount", "total_transactions"
-        ]
+        try:
+            product_summary = fetch_product_summary(*filters)
+        except Exception as e:
+            print(f"Error fetching product summary: {str(e)}")
+            recheck_connection()
+            return pd.DataFrame()
         
-        return product_summary.reset_index()
+        return product_summary.round(2)
 
 app = App(app_ui, server)
\ No newline at end of file
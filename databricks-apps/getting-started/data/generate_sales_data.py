@@ -1,7 +1,12 @@
 import pandas as pd
-from datetime import datetime, timedelta
-import random
+from datetime import datetime
+import os
+import copy
+import uuid
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 from faker import Faker
 
 fake = Faker()
@@ -11,10 +16,10 @@ class SalesDataGenerator:
         self.num_records = num_records
         self.random_seed = random_seed
         
-        # Set random seeds for reproducibility
-        random.seed(random_seed)
-        np.random.seed(random_seed)
+        # Set random seeds for reproducibility; every numeric draw comes from
+        # this one Generator, Faker only supplies names and emails
         fake.seed_instance(random_seed)
+        self.rng = np.random.default_rng(random_seed)
         
         self.product_catalog = {
             'Laptop': {'price_range': (800, 2500), 'weight': 0.15, 'seasonal_factor': 1.2},
@@ -30,6 +35,15 @@ class SalesDataGenerator:
             'Speaker': {'price_range': (80, 500), 'weight': 0.10, 'seasonal_factor': 1.1},
             'Router': {'price_range': (100, 400), 'weight': 0.05, 'seasonal_factor': 1.0}
         }
+        self.products = list(self.product_catalog.keys())
+        
+        # Catalog fields as arrays aligned with self.products, so per-record
+        # lookups are a single gather by product index
+        self._price_lo = np.array([v['price_range'][0] for v in self.product_catalog.values()])
+        self._price_hi = np.array([v['price_range'][1] for v in self.product_catalog.values()])
+        self._prod_seasonal = np.array([v['seasonal_factor'] for v in self.product_catalog.values()])
+        self._prod_weight = np.array([v['weight'] for v in self.product_catalog.values()])
+        
         self.regions = ['North', 'South', 'East', 'West', 'Central']
         self.sales_channels = ['Online', 'Retail', 'Partner', 'Direct']
         self.channel_weights = {'Online': 0.45, 'Retail': 0.30, 'Partner': 0.15, 'Direct': 0.10}
@@ -51,6 +65,19 @@ class SalesDataGenerator:
             'Central': {'economic_strength': 1.0, 'tech_adoption': 1.0}
         }
         
+        # Regional price multiplier for each (product, region) pair. Tech
+        # products are more affected by tech adoption rates, so they use the
+        # average of economic strength and tech adoption
+        tech_products = ['Laptop', 'Desktop', 'Smartphone', 'Tablet', 'Webcam']
+        is_tech = np.array([p in tech_products for p in self.products])
+        economic_strength = np.array([self.regional_factors[r]['economic_strength'] for r in self.regions])
+        tech_adoption = np.array([self.regional_factors[r]['tech_adoption'] for r in self.regions])
+        self._region_mult = np.where(
+            is_tech[:, None],
+            (economic_strength[None, :] + tech_adoption[None, :]) / 2,
+            economic_strength[None, :]
+        )
+        
         # Product bundles (products often bought together)
         self.product_bundles = {
             'Laptop': ['Mouse', 'Keyboard', 'Headphones'],
@@ -60,6 +87,18 @@ class SalesDataGenerator:
             'Webcam': ['Headphones', 'Speaker']
         }
         
+        # Bundle partners as a padded (product, partner) index table with a
+        # partner count per product, and bundle probability by segment
+        max_partners = max(len(b) for b in self.product_bundles.values())
+        self._bundle_choices = np.zeros((len(self.products), max_partners), dtype=int)
+        self._bundle_counts = np.zeros(len(self.products), dtype=int)
+        for product, partners in self.product_bundles.items():
+            i = self.products.index(product)
+            self._bundle_choices[i, :len(partners)] = [self.products.index(p) for p in partners]
+            self._bundle_counts[i] = len(partners)
+        bundle_probability = {'Enterprise': 0.4, 'SMB': 0.3, 'Consumer': 0.15, 'Education': 0.35}
+        self._bundle_prob = np.array([bundle_probability[s] for s in self.customer_segments])
+        
         # Top performing salespeople (create performance tiers)
         self.salesperson_tiers = {
             'top_performer': {'weight': 0.10, 'performance_mult': 1.8},
@@ -68,31 +107,87 @@ class SalesDataGenerator:
             'low_performer': {'weight': 0.20, 'performance_mult': 0.6}
         }
         
+        # Cumulative distributions for the fixed weighted choices, built once
+        # so each draw is a searchsorted rather than a validating choice()
+        self._segment_names = np.array(list(self.customer_segments.keys()), dtype=object)
+        self._segment_aov = np.array([v['avg_order_value'] for v in self.customer_segments.values()])
+        self._segment_cdf = self._build_cdf([v['weight'] for v in self.customer_segments.values()])
+        self._tier_names = np.array(list(self.salesperson_tiers.keys()), dtype=object)
+        self._tier_perf = np.array([v['performance_mult'] for v in self.salesperson_tiers.values()])
+        
+        # Product and channel are drawn for every record, so they use alias
+        # tables: constant-time draws with no search over the distribution
+        self._product_prob, self._product_alias = self._build_alias(self._prod_weight)
+        self._channel_prob, self._channel_alias = self._build_alias(
+            [self.channel_weights[c] for c in self.sales_channels]
+        )
+        
+        # Discount ranges by sales channel, and the high-value products that
+        # are discounted less often
+        channel_discount_ranges = {'Online': (0, 10), 'Retail': (0, 8), 'Partner': (5, 15), 'Direct': (8, 20)}
+        self._channel_discount_lo = np.array([channel_discount_ranges[c][0] for c in self.sales_channels])
+        self._channel_discount_hi = np.array([channel_discount_ranges[c][1] for c in self.sales_channels])
+        self._is_high_value = np.array([p in ['Laptop', 'Desktop', 'Smartphone'] for p in self.products])
+        
+        # Seasonal multiplier lookup per month (index 1-12): holiday seasons
+        # (Nov-Dec) and back-to-school (Aug-Sep)
+        self._month_mult = np.ones(13)
+        self._month_mult[[11, 12]] = 1.5
+        self._month_mult[[8, 9]] = 1.2
+        
+        # Quantity distributions by product type: big-ticket, mid-range and
+        # accessories. Stored as one (bucket, value) table of quantities and
+        # CDFs, padded with 1.0 so padding is never selected, plus each
+        # product's bucket
+        quantity_weights = [
+            [0.8, 0.15, 0.05],
+            [0.7, 0.2, 0.08, 0.02],
+            [0.4, 0.3, 0.15, 0.08, 0.05, 0.02]
+        ]
+        max_values = max(len(w) for w in quantity_weights)
+        self._qty_vals = np.tile(np.arange(1, max_values + 1), (len(quantity_weights), 1))
+        self._qty_cdfs = np.ones((len(quantity_weights), max_values))
+        for bucket, weights in enumerate(quantity_weights):
+            self._qty_cdfs[bucket, :len(weights)] = self._build_cdf(weights)
+        
+        self._qty_bucket = np.full(len(self.products), 2, dtype=np.int8)  # Accessories
+        for i, product in enumerate(self.products):
+            if product in ['Laptop', 'Desktop', 'Tablet', 'Smartphone']:
+                self._qty_bucket[i] = 0
+            elif product in ['Monitor', 'Printer']:
+                self._qty_bucket[i] = 1
+        
         # Generate fixed customer and salesperson pools
         self.max_customers = 500
         self.max_salespeople = 25
         self._generate_customer_pool()
         self._generate_salesperson_pool()
         
+        # Records are generated in fixed-size chunks, each from its own random
+        # stream, so large runs spread across processes. The chunk count
+        # depends only on num_records, keeping output independent of core count
+        self.records_per_chunk = 50000
+        
+    def _generate_uuids(self, n):
+        """Generate n random UUID4 strings from the seeded generator"""
+        # One bytes draw for the whole batch; unlike uuid.uuid4() this stays
+        # reproducible under the generator's seed
+        raw = self.rng.bytes(16 * n)
+        return [str(uuid.UUID(bytes=raw[i:i + 16], version=4)) for i in range(0, 16 * n, 16)]
+    
     def _generate_customer_pool(self):
         """Generate a fixed pool of customers with segments"""
-        self.customers = []
-        
-        for _ in range(self.max_customers):
-            # Select customer segment
-            segment = self._get_customer_segment()
-            
-            customer = {
-                'customer_id': fake.uuid4(),
-                'customer_name': fake.name(),
-                'customer_email': fake.email(),
-                'customer_segment': segment
-            }
-            self.customers.append(customer)
+        # Customers are only ever looked up by index, so each field is drawn
+        # for the whole pool at once and kept as an array
+        self.customer_ids = np.array(self._generate_uuids(self.max_customers), dtype=object)
+        self.customer_names = np.array([fake.name() for _ in range(self.max_customers)], dtype=object)
+        self.customer_emails = np.array([fake.email() for _ in range(self.max_customers)], dtype=object)
+        self.customer_segment_idx = self._sample_cdf(self._segment_cdf, self.max_customers)
     
     def _generate_salesperson_pool(self):
         """Generate a fixed pool of salespeople with performance tiers"""
-        self.salespeople = []
+        salesperson_names = []
+        salesperson_tiers = []
         
         # Distribute salespeople across performance tiers
         tier_counts = {
@@ -115,263 +210,292 @@ class SalesDataGenerator:
                 else:
                     salesperson_name = base_name
                 
-                salesperson = {
-                    'salesperson': salesperson_name,
-                    'salesperson_tier': tier,
-                    'assigned_customers': []
-                }
-                self.salespeople.append(salesperson)
+                salesperson_names.append(salesperson_name)
+                salesperson_tiers.append(list(self.salesperson_tiers).index(tier))
+        
+        self.salesperson_names = np.array(salesperson_names, dtype=object)
+        self.salesperson_tier_idx = np.array(salesperson_tiers)
         
         # Assign customers to salespeople (each salesperson gets ~20 customers)
-        customers_per_salesperson = len(self.customers) // len(self.salespeople)
-        
-        for i, salesperson in enumerate(self.salespeople):
-            start_idx = i * customers_per_salesperson
-            end_idx = start_idx + customers_per_salesperson
-            
-            # Handle remainder for last salesperson
-            if i == len(self.salespeople) - 1:
-                end_idx = len(self.customers)
-            
-            salesperson['assigned_customers'] = self.customers[start_idx:end_idx]
+        # as contiguous [start, end) ranges of the customer pool
+        num_salespeople = len(self.salesperson_names)
+        customers_per_salesperson = self.max_customers // num_salespeople
+        starts = np.arange(num_salespeople) * customers_per_salesperson
+        ends = starts + customers_per_salesperson
+        
+        # Handle remainder for last salesperson
+        ends[-1] = self.max_customers
+        
+        self.salesperson_customer_ranges = np.column_stack([starts, ends])
     
-    def _get_customer_and_salesperson(self):
-        """Get a customer and their assigned salesperson"""
-        # Select a random salesperson
-        salesperson_data = random.choice(self.salespeople)
+    def _get_customers_and_salespeople(self, n):
+        """Get n customer indices and the index of each one's assigned salesperson"""
+        # Select random salespeople
+        salesperson_idx = self.rng.integers(0, len(self.salesperson_names), size=n)
         
         # Select one of their assigned customers
-        customer_data = random.choice(salesperson_data['assigned_customers'])
-        
-        return customer_data, salesperson_data
-        
-    def _get_seasonal_multiplier(self, date_obj, product):
-        """Calculate seasonal multiplier based on date and product"""
-        month = date_obj.month
-        seasonal_factor = self.product_catalog[product]['seasonal_factor']
-        
-        # Holiday seasons (Nov-Dec) and back-to-school (Aug-Sep)
-        if month in [11, 12]:
-            return seasonal_factor * 1.5
-        elif month in [8, 9]:
-            return seasonal_factor * 1.2
-        else:
-            return seasonal_factor
+        ranges = self.salesperson_customer_ranges[salesperson_idx]
+        customer_idx = self.rng.integers(ranges[:, 0], ranges[:, 1])
+        
+        return customer_idx, salesperson_idx
+        
+    def _build_cdf(self, weights):
+        """Normalized cumulative distribution for sampling with searchsorted"""
+        cdf = np.cumsum(weights, dtype=float)
+        return cdf / cdf[-1]
     
-    def _get_realistic_quantity(self, product):
-        """Get realistic quantity based on product type"""
-        if product in ['Laptop', 'Desktop', 'Tablet', 'Smartphone']:
-            return np.random.choice([1, 2, 3], p=[0.8, 0.15, 0.05])
-        elif product in ['Monitor', 'Printer']:
-            return np.random.choice([1, 2, 3, 4], p=[0.7, 0.2, 0.08, 0.02])
-        else:  # Accessories
-            return np.random.choice([1, 2, 3, 4, 5, 6], p=[0.4, 0.3, 0.15, 0.08, 0.05, 0.02])
+    def _sample_cdf(self, cdf, n=None):
+        """Draw indices from a cumulative distribution"""
+        return np.searchsorted(cdf, self.rng.random(n), side='right')
     
-    def _get_realistic_discount(self, product, channel, quantity):
-        """Get realistic discount based on product, channel, and quantity"""
-        base_discount = 0
+    def _build_alias(self, weights):
+        """Walker alias table for a weighted choice, using Vose's construction"""
+        k = len(weights)
+        scaled = np.asarray(weights, dtype=float) * k / np.sum(weights)
+        prob = np.ones(k)
+        alias = np.arange(k)
+        
+        # Pair each under-full column with an over-full one that tops it up
+        small = [i for i in range(k) if scaled[i] < 1.0]
+        large = [i for i in range(k) if scaled[i] >= 1.0]
+        while small and large:
+            under = small.pop()
+            over = large.pop()
+            prob[under] = scaled[under]
+            alias[under] = over
+            scaled[over] -= 1.0 - scaled[under]
+            if scaled[over] < 1.0:
+                small.append(over)
+            else:
+                large.append(over)
+        
+        return prob, alias
+    
+    def _sample_alias(self, prob, alias, n):
+        """Draw n indices from an alias table"""
+        # One uniform picks the column (integer part) and decides between it
+        # and its alias (fractional part)
+        u = self.rng.random(n) * len(prob)
+        column = u.astype(int)
+        return np.where(u - column < prob[column], column, alias[column])
+    
+    def _get_realistic_quantities(self, product_idx):
+        """Get realistic quantities for an array of product indices"""
+        bucket = self._qty_bucket[product_idx]
+        
+        # Counting the CDF entries at or below each draw is searchsorted
+        # over every record's own row, with no per-bucket dispatch
+        u = self.rng.random(len(product_idx))
+        value_idx = np.sum(u[:, None] >= self._qty_cdfs[bucket], axis=1)
+        return self._qty_vals[bucket, value_idx]
+    
+    def _get_realistic_discounts(self, product_idx, channel_idx, quantity):
+        """Get realistic discounts based on product, channel, and quantity arrays"""
+        n = len(product_idx)
         
         # Channel-based discounts
-        if channel == 'Partner':
-            base_discount = np.random.uniform(5, 15)
-        elif channel == 'Direct':
-            base_discount = np.random.uniform(8, 20)
-        elif channel == 'Online':
-            base_discount = np.random.uniform(0, 10)
-        else:  # Retail
-            base_discount = np.random.uniform(0, 8)
+        base_discount = self.rng.uniform(
+            self._channel_discount_lo[channel_idx],
+            self._channel_discount_hi[channel_idx]
+        )
         
         # Volume discount
-        if quantity >= 5:
-            base_discount += np.random.uniform(3, 8)
-        elif quantity >= 3:
-            base_discount += np.random.uniform(1, 5)
-        
-        # Product-specific discount probability
-        if product in ['Laptop', 'Desktop', 'Smartphone']:
-            # High-value items get discounts less frequently
-            if random.random() < 0.3:
-                return round(base_discount, 2)
-            else:
-                return 0
-        else:
-            # Accessories get discounts more frequently
-            if random.random() < 0.6:
-                return round(base_discount, 2)
-            else:
-                return 0
+        base_discount += np.where(
+            quantity >= 5, self.rng.uniform(3, 8, n),
+            np.where(quantity >= 3, self.rng.uniform(1, 5, n), 0)
+        )
+        
+        # Product-specific discount probability: high-value items get
+        # discounts less frequently than accessories
+        discount_probability = np.where(self._is_high_value[product_idx], 0.3, 0.6)
+        # Left unrounded; callers round the final discount column once
+        return np.where(self.rng.random(n) < discount_probability, base_discount, 0.0)
     
-    def _get_customer_segment(self):
-        """Select customer segment based on weights"""
-        segments = list(self.customer_segments.keys())
-        weights = [self.customer_segments[s]['weight'] for s in segments]
-        return np.random.choice(segments, p=weights)
+    def _get_bundle_parents(self, product_idx, segment_idx):
+        """Indices of the records that should trigger a bundle purchase"""
+        # Only products with bundle partners qualify; Enterprise and SMB
+        # customers are more likely to buy bundles
+        has_bundle = self._bundle_counts[product_idx] > 0
+        make_bundle = has_bundle & (self.rng.random(len(product_idx)) < self._bundle_prob[segment_idx])
+        return np.flatnonzero(make_bundle)
     
-    def _get_salesperson_tier(self):
-        """Select salesperson performance tier"""
-        tiers = list(self.salesperson_tiers.keys())
-        weights = [self.salesperson_tiers[t]['weight'] for t in tiers]
-        return np.random.choice(tiers, p=weights)
+    def _create_bundle_records(self, product_idx, channel_idx, region_idx, seasonal_mult, segment_mult):
+        """Create the fields of bundle purchases that differ from their parent records"""
+        n = len(product_idx)
+        
+        # Pick one of each parent product's bundle partners
+        choice = (self.rng.random(n) * self._bundle_counts[product_idx]).astype(int)
+        bundle_product_idx = self._bundle_choices[product_idx, choice]
+        bundle_quantity = self._get_realistic_quantities(bundle_product_idx)
+        
+        # Bundle items often have different pricing
+        bundle_base_price = self.rng.uniform(
+            self._price_lo[bundle_product_idx], self._price_hi[bundle_product_idx]
+        )
+        bundle_adjusted_price = self._apply_regional_factors(
+            bundle_base_price * seasonal_mult, region_idx, bundle_product_idx
+        )
+        bundle_unit_price = np.round(bundle_adjusted_price * segment_mult, 2)
+        
+        # Bundle discount (often better)
+        bundle_discount = self._get_realistic_discounts(bundle_product_idx, channel_idx, bundle_quantity)
+        bundle_discount_percent = np.round(bundle_discount * 1.2, 2)
+        
+        # Recalculate total
+        bundle_subtotal = bundle_quantity * bundle_unit_price
+        bundle_discount_amount = bundle_subtotal * (bundle_discount_percent / 100)
+        
+        bundle_total_amount = np.round(bundle_subtotal - bundle_discount_amount, 2)
+        
+        return bundle_product_idx, bundle_quantity, bundle_unit_price, bundle_discount_percent, bundle_total_amount
     
-    def _should_create_bundle(self, product, customer_segment):
-        """Determine if this should be a bundle purchase"""
-        if product not in self.product_bundles:
-            return False
-        
-        # Enterprise and SMB customers more likely to buy bundles
-        bundle_probability = {
-            'Enterprise': 0.4,
-            'SMB': 0.3,
-            'Consumer': 0.15,
-            'Education': 0.35
-        }
-        
-        return random.random() < bundle_probability.get(customer_segment, 0.1)
+    def _dictionary_array(self, codes, categories):
+        """Dictionary-encoded Arrow column from category codes"""
+        return pa.DictionaryArray.from_arrays(
+            pa.array(codes, type=pa.int8()), pa.array(categories, type=pa.string())
+        )
     
-    def _apply_regional_factors(self, price, region, product):
+    def _apply_regional_factors(self, price, region_idx, product_idx):
         """Apply regional economic and tech adoption factors"""
-        regional_factor = self.regional_factors[region]
-        
-        # Tech products are more affected by tech adoption rates
-        tech_products = ['Laptop', 'Desktop', 'Smartphone', 'Tablet', 'Webcam']
-        
-        if product in tech_products:
-            multiplier = (regional_factor['economic_strength'] + regional_factor['tech_adoption']) / 2
-        else:
-            multiplier = regional_factor['economic_strength']
-        
-        return price * multiplier
+        return price * self._region_mult[product_idx, region_idx]
+    
+    def generate_table(self) -> pa.Table:
+        """Generate synthetic sales data as an Arrow table"""
+        # Generate random dates within the last 2 years, from one start date
+        # shared by every chunk
+        start_date = np.datetime64(datetime.now().date()) - np.timedelta64(730, 'D')
+        
+        num_chunks = max(1, -(-self.num_records // self.records_per_chunk))
+        chunk_sizes = [len(c) for c in np.array_split(np.arange(self.num_records), num_chunks)]
+        chunk_seeds = np.random.SeedSequence(self.random_seed).spawn(num_chunks)
+        
+        if num_chunks == 1:
+            return self._generate_chunk(chunk_sizes[0], chunk_seeds[0], start_date)
+        
+        # Chunks are independent, so generate them in parallel processes
+        num_workers = min(num_chunks, os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            tables = executor.map(
+                self._generate_chunk, chunk_sizes, chunk_seeds, [start_date] * num_chunks
+            )
+            return pa.concat_tables(list(tables))
+    
+    def _generate_chunk(self, n, seed, start_date) -> pa.Table:
+        """Generate n records from an independent random stream"""
+        # Work on a shallow copy so the chunk's Generator never touches
+        # this instance's; the catalog and pools are shared read-only
+        generator = copy.copy(self)
+        generator.rng = np.random.default_rng(seed)
+        return generator._generate_records(n, start_date)
+    
+    def _generate_records(self, n, start_date) -> pa.Table:
+        """Generate n records, plus their bundle purchases, as an Arrow table"""
+        # Draw every record's product, region and channel in bulk rather
+        # than one random call per record. Product and channel come from the
+        # alias tables built in __init__, indexed in the order of
+        # self.products and self.sales_channels
+        product_idx = self._sample_alias(self._product_prob, self._product_alias, n)
+        region_idx = self.rng.integers(0, len(self.regions), size=n)
+        channel_idx = self._sample_alias(self._channel_prob, self._channel_alias, n)
+        
+        # Dates as datetime64 days offset from the shared start date
+        day_offsets = self.rng.integers(0, 731, size=n)
+        dates = start_date + day_offsets.astype('timedelta64[D]')
+        months = dates.astype('datetime64[M]').astype(int) % 12 + 1
+        
+        # Get customers and their assigned salespeople
+        customer_idx, salesperson_idx = self._get_customers_and_salespeople(n)
+        segment_idx = self.customer_segment_idx[customer_idx]
+        tier_idx = self.salesperson_tier_idx[salesperson_idx]
+        perf_mult = self._tier_perf[tier_idx]
+        
+        # Generate price with variation, seasonal adjustment, and regional factors
+        base_price = self.rng.uniform(self._price_lo[product_idx], self._price_hi[product_idx])
+        seasonal_mult = self._month_mult[months] * self._prod_seasonal[product_idx]
+        adjusted_price = self._apply_regional_factors(base_price * seasonal_mult, region_idx, product_idx)
+        
+        # Apply customer segment multiplier
+        segment_mult = self._segment_aov[segment_idx]
+        unit_price = np.round(adjusted_price * segment_mult, 2)
+        
+        # Get realistic quantities for every record at once
+        base_quantity = self._get_realistic_quantities(product_idx)
+        
+        # Quantity is influenced by customer segment: Enterprise bulk orders
+        # and Education classroom sets multiply the base quantity
+        segments = list(self.customer_segments)
+        bulk = (segment_idx == segments.index('Enterprise')) & (self.rng.random(n) < 0.3)
+        classroom = (segment_idx == segments.index('Education')) & (self.rng.random(n) < 0.4)
+        quantity_mult = np.ones(n, dtype=int)
+        quantity_mult[bulk] = self.rng.integers(2, 6, size=bulk.sum())
+        quantity_mult[classroom] = self.rng.integers(2, 4, size=classroom.sum())
+        quantity = base_quantity * quantity_mult
+        
+        # Get realistic discounts
+        discount = self._get_realistic_discounts(product_idx, channel_idx, quantity)
+        
+        # Apply salesperson performance factor to discount: good salespeople
+        # get better prices, poor salespeople give higher discounts
+        discount *= np.where(perf_mult > 1.0, 0.8, np.where(perf_mult < 1.0, 1.3, 1.0))
+        discount_percent = np.round(discount, 2)
+        
+        # Calculate total amount
+        subtotal = quantity * unit_price
+        total_amount = np.round(subtotal - subtotal * (discount_percent / 100), 2)
+        
+        # Check which records should trigger a bundle purchase. Bundle
+        # records share the parent's customer, date, region, channel and
+        # salesperson, so they are represented by their parent's index and
+        # only the fields that differ are generated
+        parents = self._get_bundle_parents(product_idx, segment_idx)
+        bundle_product_idx, bundle_quantity, bundle_unit_price, bundle_discount_percent, bundle_total_amount = (
+            self._create_bundle_records(
+                product_idx[parents], channel_idx[parents], region_idx[parents],
+                seasonal_mult[parents], segment_mult[parents]
+            )
+        )
+        
+        # Each output row's source record: the records themselves, then the
+        # parents of the bundle records
+        source = np.concatenate([np.arange(n), parents])
+        customer_idx = customer_idx[source]
+        salesperson_idx = salesperson_idx[source]
+        
+        # Assemble the Arrow columns directly from the sampled arrays, with
+        # no intermediate DataFrame. The low-cardinality columns are
+        # dictionary arrays built straight from the sampled indices, so they
+        # are written to parquet as small integer codes
+        return pa.table({
+            'transaction_id': pa.array(self._generate_uuids(len(source)), type=pa.string()),
+            'date': pa.array(dates[source], type=pa.date32()),
+            'product': self._dictionary_array(np.concatenate([product_idx, bundle_product_idx]), self.products),
+            'quantity': pa.array(np.concatenate([quantity, bundle_quantity]), type=pa.int16()),
+            'unit_price': pa.array(np.concatenate([unit_price, bundle_unit_price]), type=pa.float64()),
+            'customer_id': pa.array(self.customer_ids[customer_idx], type=pa.string()),
+            'customer_name': pa.array(self.customer_names[customer_idx], type=pa.string()),
+            'customer_email': pa.array(self.customer_emails[customer_idx], type=pa.string()),
+            'customer_segment': self._dictionary_array(segment_idx[source], self._segment_names),
+            'region': self._dictionary_array(region_idx[source], self.regions),
+            'sales_channel': self._dictionary_array(channel_idx[source], self.sales_channels),
+            'salesperson': pa.array(self.salesperson_names[salesperson_idx], type=pa.string()),
+            'salesperson_tier': self._dictionary_array(tier_idx[source], self._tier_names),
+            'discount_percent': pa.array(np.concatenate([discount_percent, bundle_discount_percent]), type=pa.float64()),
+            'total_amount': pa.array(np.concatenate([total_amount, bundle_total_amount]), type=pa.float64())
+        })
     
     def generate_data(self) -> pd.DataFrame:
         """Generate synthetic sales data"""
-        data = []
-        
-        # Create weighted product selection
-        products = list(self.product_catalog.keys())
-        weights = [self.product_catalog[p]['weight'] for p in products]
-        
-        # Normalize weights to sum to 1
-        total_weight = sum(weights)
-        weights = [w / total_weight for w in weights]
-        
-        # Create weighted channel selection
-        channels = list(self.channel_weights.keys())
-        channel_weights = list(self.channel_weights.values())
-        
-        bundle_transactions = []
-        
-        for _ in range(self.num_records):
-            # Generate random date within the last 2 years
-            start_date = datetime.now() - timedelta(days=730)
-            random_date = start_date + timedelta(days=random.randint(0, 730))
-            
-            # Get customer and their assigned salesperson
-            customer_data, salesperson_data = self._get_customer_and_salesperson()
-            
-            # Select product based on realistic market share
-            product = np.random.choice(products, p=weights)
-            
-            # Select region
-            region = random.choice(self.regions)
-            
-            # Get realistic price range for product
-            price_range = self.product_catalog[product]['price_range']
-            seasonal_mult = self._get_seasonal_multiplier(random_date, product)
-            
-            # Generate price with variation, seasonal adjustment, and regional factors
-            base_price = np.random.uniform(price_range[0], price_range[1])
-            adjusted_price = base_price * seasonal_mult
-            adjusted_price = self._apply_regional_factors(adjusted_price, region, product)
-            
-            # Apply customer segment multiplier
-            customer_segment = customer_data['customer_segment']
-            segment_mult = self.customer_segments[customer_segment]['avg_order_value']
-            unit_price = round(adjusted_price * segment_mult, 2)
-            
-            # Get realistic quantity (influenced by customer segment)
-            base_quantity = self._get_realistic_quantity(product)
-            if customer_segment == 'Enterprise' and random.random() < 0.3:
-                quantity = base_quantity * random.randint(2, 5)  # Bulk orders
-            elif customer_segment == 'Education' and random.random() < 0.4:
-                quantity = base_quantity * random.randint(2, 3)  # Classroom sets
-            else:
-                quantity = base_quantity
-            
-            # Select sales channel based on realistic distribution
-            sales_channel = np.random.choice(channels, p=channel_weights)
-            
-            # Get realistic discount
-            discount_percent = self._get_realistic_discount(product, sales_channel, quantity)
-            
-            # Apply salesperson performance factor to discount
-            salesperson_tier = salesperson_data['salesperson_tier']
-            perf_mult = self.salesperson_tiers[salesperson_tier]['performance_mult']
-            if perf_mult > 1.0:  # Good salespeople get better prices
-                discount_percent *= 0.8
-            elif perf_mult < 1.0:  # Poor salespeople give higher discounts
-                discount_percent *= 1.3
-            
-            record = {
-                'transaction_id': fake.uuid4(),
-                'date': random_date.date(),
-                'product': product,
-                'quantity': quantity,
-                'unit_price': unit_price,
-                'customer_id': customer_data['customer_id'],
-                'customer_name': customer_data['customer_name'],
-                'customer_email': customer_data['customer_email'],
-                'customer_segment': customer_segment,
-                'region': region,
-                'sales_channel': sales_channel,
-                'salesperson': salesperson_data['salesperson'],
-                'salesperson_tier': salesperson_tier,
-                'discount_percent': round(discount_percent, 2),
-            }
-            
-            # Calculate total amount
-            subtotal = record['quantity'] * record['unit_price']
-            discount_amount = subtotal * (record['discount_percent'] / 100)
-            record['total_amount'] = round(subtotal - discount_amount, 2)
-            
-            data.append(record)
-            
-            # Check if this should trigger a bundle purchase
-            if self._should_create_bundle(product, customer_segment):
-                bundle_products = self.product_bundles[product]
-                bundle_product = random.choice(bundle_products)
-                
-                # Create bundle transaction with same customer/date/salesperson
-                bundle_record = record.copy()
-                bundle_record['transaction_id'] = fake.uuid4()
-                bundle_record['product'] = bundle_product
-                bundle_record['quantity'] = self._get_realistic_quantity(bundle_product)
-                
-                # Bundle items often have different pricing
-                bundle_price_range = self.product_catalog[bundle_product]['price_range']
-                bundle_base_price = np.random.uniform(bundle_price_range[0], bundle_price_range[1])
-                bundle_adjusted_price = bundle_base_price * seasonal_mult
-                bundle_adjusted_price = self._apply_regional_factors(bundle_adjusted_price, region, bundle_product)
-                bundle_record['unit_price'] = round(bundle_adjusted_price * segment_mult, 2)
-                
-                # Bundle discount (often better)
-                bundle_discount = self._get_realistic_discount(bundle_product, sales_channel, bundle_record['quantity'])
-                bundle_record['discount_percent'] = round(bundle_discount * 1.2, 2)  # Better bundle discount
-                
-                # Recalculate total
-                bundle_subtotal = bundle_record['quantity'] * bundle_record['unit_price']
-                bundle_discount_amount = bundle_subtotal * (bundle_record['discount_percent'] / 100)
-                bundle_record['total_amount'] = round(bundle_subtotal - bundle_discount_amount, 2)
-                
-                bundle_transactions.append(bundle_record)
-        
-        # Add bundle transactions to main data
-        data.extend(bundle_transactions)
-        
-        return pd.DataFrame(data)
+        return self.generate_table().to_pandas()
     
-    def save_to_parquet(self, df: pd.DataFrame, filename: str = 'sales.parquet'):
-        """Save DataFrame to parquet format"""
-        df.to_parquet(filename, engine='pyarrow', compression='snappy')
+    def save_to_parquet(self, data, filename: str = 'sales.parquet'):
+        """Save an Arrow table or DataFrame to parquet format"""
+        table = data
+        if isinstance(data, pd.DataFrame):
+            table = pa.Table.from_pandas(data, preserve_index=False)
+        
+        # Categorical columns are written dictionary-encoded; zstd compresses
+        # the repeated codes and IDs smaller than snappy at similar speed
+        pq.write_table(table, filename, compression='zstd', use_dictionary=True)
         print(f"Data saved to {filename}")
         return filename
 
@@ -383,19 +507,19 @@ def main():
     # Generate synthetic data
     print("Generating synthetic sales data...")
     generator = SalesDataGenerator(NUM_RECORDS)
-    df = generator.generate_data()
+    table = generator.generate_table()
     
-    print(f"Generated {len(df)} records")
-    print(f"Data shape: {df.shape}")
-    print(f"Columns: {list(df.columns)}")
+    print(f"Generated {table.num_rows} records")
+    print(f"Data shape: {table.shape}")
+    print(f"Columns: {table.column_names}")
     
-    # Save to parquet
+    # Save to parquet straight from the Arrow table
     print("\nSaving to parquet format...")
-    generator.save_to_parquet(df, PARQUET_FILE)
+    generator.save_to_parquet(table, PARQUET_FILE)
     
     # Display sample data
     print("\nSample data:")
-    print(df.head())
+    print(table.slice(0, 5).to_pandas())
     
     print(f"\nParquet file saved as: {PARQUET_FILE}")
 